@@ -188,6 +188,7 @@ def evaluate(
             relative = time_ns / calibration
 
             predictions = {}
+            results = {c.result for c in cases}
             for line in fpred.splitlines():
                 try:
                     query, pred = line.split(";")
@@ -196,12 +197,12 @@ def evaluate(
                     logger.warning(f"Tool {tool_name!r} produced bad output")
                     logger.warning(line)
                     continue
-                if not query in QUERIES:
+                if query not in QUERY_SET:
                     logger.warning(f"{query!r} not a known query")
                     continue
                 prediction = Prediction.parse(pred)
                 predictions[query] = prediction
-                sometimes = any(query == c.result for c in cases)
+                sometimes = query in results
                 score = prediction.score(sometimes)
                 logger.debug(
                     f"Check query {query!r} ({sometimes}): waged {prediction.wager:0.3f}"
@@ -251,7 +252,7 @@ def evaluate(
     experiment["version"] = version
 
     with open(output, "w", encoding="utf-8") as fp:
-        json.dump(experiment, fp)
+        json.dump(experiment, fp, separators=(",", ":"))
 
     logger.success(f"Written results to {output!r}")
 
@@ -34,6 +34,12 @@ WORKFOLDER = Path(os.path.abspath(__file__)).parent.parent
     help="only take methods that matches the regex.",
     callback=re_parser,
 )
+@click.option(
+    "--workers",
+    show_default=True,
+    default=1,
+    help="number of cases to run concurrently.",
+)
 @click.argument("cmd", nargs=-1, type=click.Path())
 def test(
     filter_methods,
@@ -42,6 +48,7 @@ def test(
     timeout,
     report,
     fail_fast,
+    workers,
 ):
     logger = setup_logger(verbose)
     suite = Suite(WORKFOLDER, QUERIES, logger)
@@ -55,26 +62,43 @@ def test(
             level="DEBUG",
         )
 
+    cases = []
     for case in sorted(suite.cases()):
         if filter_methods and not filter_methods.search(str(case.methodid)):
             logger.trace(f"{case} did not match {filter_methods}")
             continue
-        logger.info(f"Running {case}")
+        cases.append(case)
 
-        result: str
+    def run(case):
+        logger.info(f"Running {case}")
         try:
             (result, _) = run_cmd(
                 cmd + (str(case.methodid), str(case.input)),
                 logger=logger,
                 timeout=timeout,
             )
+            return (case, result, None)
         except subprocess.CalledProcessError as e:
-            logger.error(e)
-            result = e.stdout
+            return (case, e.stdout, e)
+
+    # The cases are independent, and the work happens in subprocesses, so
+    # threads are enough to run them concurrently; results are consumed
+    # in case order either way.
+    if workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        executor = ThreadPoolExecutor(workers)
+        outcomes = executor.map(run, cases)
+    else:
+        outcomes = map(run, cases)
+
+    for case, result, err in outcomes:
+        if err is not None:
+            logger.error(err)
             if fail_fast:
-                for i in e.stderr.splitlines():
+                for i in err.stderr.splitlines():
                     logger.warning(i)
-                for i in e.stdout.splitlines():
+                for i in err.stdout.splitlines():
                     logger.warning(i)
                 logger.error("Failing fast")
                 sys.exit(-1)
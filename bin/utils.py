@@ -1,5 +1,6 @@
 import collections
 from dataclasses import dataclass
+from functools import lru_cache
 from io import StringIO
 from pathlib import Path
 from typing import TextIO, TypeVar
@@ -24,6 +25,12 @@ QUERIES = [
     "out of bounds",
 ]
 
+# Membership checks go through the set; the list keeps the output order.
+QUERY_SET = frozenset(QUERIES)
+
+CASE_RE = re.compile(r"([^ ]*) +(\([^)]*\)) -> (.*)")
+WAGER_RE = re.compile(r"([^%]*)\%")
+
 
 def re_parser(ctx_, parms_, expr):
     import re
@@ -77,7 +84,7 @@ def setup_logger(verbose):
     return logger.bind(process="main")
 
 
-@dataclass(frozen=True, order=True)
+@dataclass(frozen=True, order=True, slots=True)
 class Input:
     val: tuple[JvmType, ...]
 
@@ -192,7 +199,7 @@ def runtime(*args, enable_assertions=False, **kwargs):
     return subprocess.check_output(pargs, text=True, **kwargs)
 
 
-@dataclass(frozen=True, order=True)
+@dataclass(frozen=True, order=True, slots=True)
 class Case:
     methodid: MethodId
     input: Input
@@ -200,7 +207,7 @@ class Case:
 
     @staticmethod
     def from_spec(line):
-        if not (m := re.match(r"([^ ]*) +(\([^)]*\)) -> (.*)", line)):
+        if not (m := CASE_RE.match(line)):
             raise ValueError(f"Unexpected line: {line!r}")
         return Case(MethodId.parse(m.group(1)), Input.parse(m.group(2)), m.group(3))
 
@@ -217,13 +224,20 @@ class Case:
         return sorted(cases_by_id.items())
 
 
-@dataclass(frozen=True)
+@lru_cache(maxsize=None)
+def _parse_cases(path, mtime):
+    """Parse a cases file at most once per modification."""
+    with open(path, "r") as f:
+        return tuple(Case.from_spec(r[:-1]) for r in f.readlines())
+
+
+@dataclass(frozen=True, slots=True)
 class Prediction:
     wager: float
 
     @staticmethod
     def parse(string: str) -> "Prediction":
-        if m := re.match(r"([^%]*)\%", string):
+        if m := WAGER_RE.match(string):
             p = float(m.group(1)) / 100
             return Prediction.from_probability(p)
         else:
@@ -264,7 +278,7 @@ class Prediction:
         return f"{self.to_probability():0.2%}"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Suite:
     workfolder: Path
     queries: list[str]
@@ -324,9 +338,8 @@ class Suite:
         self.logger.info("Done")
 
     def cases(self):
-        with open(self.stats_folder() / "cases.txt", "r") as f:
-            for r in f.readlines():
-                yield Case.from_spec(r[:-1])
+        path = self.stats_folder() / "cases.txt"
+        return _parse_cases(path, path.stat().st_mtime_ns)
 
     def check(self):
         self.logger.info("Checking cases")
@@ -1,6 +1,7 @@
 from typing import NoReturn, TypeAlias, Literal, Optional
 from dataclasses import dataclass
 from collections import namedtuple
+from functools import lru_cache
 from pathlib import Path
 import re
 import sys
@@ -82,7 +83,7 @@ def string_compare(cls):
     return total_ordering(cls)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 @string_compare
 class BoolValue:
     value: bool
@@ -91,10 +92,10 @@ class BoolValue:
         return "true" if self.value else "false"
 
     def tolocal(self):
-        return IntValue(1) if self.value else IntValue(0)
+        return 1 if self.value else 0
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 @string_compare
 class IntValue:
     value: int
@@ -105,8 +106,16 @@ class IntValue:
     def tolocal(self):
         return self.value
 
+    @classmethod
+    def of(cls, value: int) -> "IntValue":
+        """Like the constructor, but returns a shared instance for small
+        integers (mirroring CPython's own small-int cache)."""
+        if -128 <= value <= 256:
+            return _SMALL_INTS[value + 128]
+        return cls(value)
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 @string_compare
 class CharValue:
     value: str
@@ -115,10 +124,13 @@ class CharValue:
         return f"'{self.value}'"
 
     def tolocal(self):
-        return IntValue(ord(self.value[0]))
+        return ord(self.value[0])
+
+
+_SMALL_INTS = tuple(IntValue(i) for i in range(-128, 257))
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 @string_compare
 class IntListValue:
     value: tuple[int]
@@ -128,10 +140,10 @@ class IntListValue:
         return f"[I:{val}]"
 
     def tolocal(self):
-        return self.value
+        return tuple(a.tolocal() for a in self.value)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 @string_compare
 class CharListValue:
     value: tuple[str]
@@ -141,13 +153,22 @@ class CharListValue:
         return f"[C:{val}]"
 
     def tolocal(self):
-        return self.value
+        return tuple(a.tolocal() for a in self.value)
 
 
 JvmValue: TypeAlias = BoolValue | IntValue | CharValue | IntListValue | CharListValue
 
 
-@dataclass(frozen=True, order=True)
+@lru_cache(maxsize=None)
+def load_classfile(path: Path) -> dict:
+    """Load a decompiled classfile, parsing the json at most once per path."""
+    import json
+
+    with open(path) as f:
+        return json.load(f)
+
+
+@dataclass(frozen=True, order=True, slots=True)
 class MethodId:
     class_name: str
     method_name: str
@@ -156,19 +177,20 @@ class MethodId:
 
     @classmethod
     def parse(cls, name):
-        import re
-
-        RE = (
-            r"(?P<class_name>.+)\.(?P<method_name>.*)\:\((?P<params>.*)\)(?P<return>.*)"
-        )
-        if (i := re.match(RE, name)) is None:
-            raise ValueError("invalid method name: %r", name)
+        try:
+            head, _, descriptor = name.rpartition(":")
+            class_name, _, method_name = head.rpartition(".")
+            params, _, return_type = descriptor[1:].partition(")")
+            if not class_name or descriptor[0] != "(":
+                raise ValueError
+        except (ValueError, IndexError):
+            raise ValueError(f"invalid method name: {name!r}") from None
 
         methodid = cls(
-            class_name=i["class_name"],
-            method_name=i["method_name"],
-            params=parse_params(i["params"]),
-            return_type=parse_return_type(i["return"]),
+            class_name=class_name,
+            method_name=method_name,
+            params=parse_params(params),
+            return_type=parse_return_type(return_type),
         )
 
         assert str(methodid) == name, f"Expected {methodid} == {name}"
@@ -187,11 +209,7 @@ class MethodId:
         return Path("src/main/java", *self.class_name.split(".")).with_suffix(".java")
 
     def load(self):
-        import json
-
-        classfile = self.classfile()
-        with open(classfile) as f:
-            classfile = json.load(f)
+        classfile = load_classfile(self.classfile())
         for m in classfile["methods"]:
             if m["name"] != self.method_name:
                 continue
@@ -225,22 +243,24 @@ class InputParser:
         self.input = input
         self.tokens = list(InputParser.tokenize(input))
 
+    TOKEN_SPECIFICATION = [
+        ("OPEN_ARRAY", r"\[[IC]:"),
+        ("CLOSE_ARRAY", r"\]"),
+        ("OPEN_INPUTS", r"\("),
+        ("CLOSE_INPUTS", r"\)"),
+        ("INT", r"-?\d+"),
+        ("BOOL", r"true|false"),
+        ("CHAR", r"'[^']'"),
+        ("COMMA", r","),
+        ("SKIP", r"[ \t]+"),
+    ]
+    TOKEN_RE = re.compile(
+        "|".join(f"(?P<{n}>{m})" for n, m in TOKEN_SPECIFICATION)
+    )
+
     @staticmethod
     def tokenize(string):
-        token_specification = [
-            ("OPEN_ARRAY", r"\[[IC]:"),
-            ("CLOSE_ARRAY", r"\]"),
-            ("OPEN_INPUTS", r"\("),
-            ("CLOSE_INPUTS", r"\)"),
-            ("INT", r"-?\d+"),
-            ("BOOL", r"true|false"),
-            ("CHAR", r"'[^']'"),
-            ("COMMA", r","),
-            ("SKIP", r"[ \t]+"),
-        ]
-        tok_regex = "|".join(f"(?P<{n}>{m})" for n, m in token_specification)
-
-        for m in re.finditer(tok_regex, string):
+        for m in InputParser.TOKEN_RE.finditer(string):
             kind, value = m.lastgroup, m.group()
             if kind == "SKIP":
                 continue
@@ -284,7 +304,7 @@ class InputParser:
 
     def parse_int(self):
         tok = self.expect("INT")
-        return IntValue(int(tok.value))
+        return IntValue.of(int(tok.value))
 
     def parse_bool(self):
         tok = self.expect("BOOL")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+""" A fuzzing solution.
+
+Runs the bytecode interpreter from interpret.py on a batch of generated
+inputs and wagers on every outcome it observes.  Running a method is a
+pure function of its inputs, so executions are memoized per input tuple
+and repeated samples cost a dict lookup instead of an interpreter run.
+"""
+
+import json
+import multiprocessing
+import os
+import random
+import sys, logging
+from functools import partial
+from pathlib import Path
+
+from jpamb_utils import MethodId
+
+from interpret import SimpleInterpreter
+
+l = logging
+l.basicConfig(level=logging.WARNING, format="%(message)s")
+
+QUERIES = [
+    "assertion error",
+    "divide by zero",
+    "null pointer",
+    "ok",
+    "out of bounds",
+]
+# The saturation check runs per execution; build the set once.
+QUERY_SET = frozenset(QUERIES)
+
+LIMIT = 100_000
+SAMPLES = 100
+CACHE = Path.home() / ".cache" / "jpamb" / "fuzzer.json"
+# Values that actually trigger the interesting paths: zero and its
+# neighbours for divisions and guards, plus the int/short boundaries for
+# overflow-sensitive loops.  Uniform draws from the full int range almost
+# never hit these.
+INTS = [
+    0, 1, -1, 2, -2, 3, 10, -10, 100, 1000,
+    (1 << 15) - 1, 1 << 15, -(1 << 15),
+    (1 << 31) - 1, -(1 << 31),
+]
+
+
+def sample(param):
+    """Draw one raw local for a parameter of the given jvm type."""
+    if param == "boolean":
+        return random.randint(0, 1)
+    if param == "int":
+        if random.random() < 0.7:
+            return random.choice(INTS)
+        return random.randint(-1000, 1000)
+    if param == "char":
+        return ord(random.choice("abcdefghijklmnopqrstuvwxyz"))
+    if param == "int[]":
+        return tuple(sample("int") for _ in range(random.randint(0, 4)))
+    if param == "char[]":
+        return tuple(sample("char") for _ in range(random.randint(0, 4)))
+    raise ValueError(f"Can't sample {param}")
+
+
+def execute(code, args):
+    """Run the interpreter once on a tuple of raw locals."""
+    locals = list(args)
+    locals.extend([None] * (code["max_locals"] - len(locals)))
+    i = SimpleInterpreter(code["bytecode"], locals, [])
+    for n, v in enumerate(i.locals):
+        if isinstance(v, tuple):
+            i.locals[n] = i.alloc(list(v))
+    return i.interpet(LIMIT)
+
+
+if __name__ == "__main__":
+    methodid = MethodId.parse(sys.argv[1])
+    code = methodid.load()["code"]
+    params = methodid.params
+
+    random.seed(0)
+
+    # A method without inputs always produces the same outcome, so it can
+    # be remembered across invocations until its classfile changes.
+    outcomes = cache = cache_key = None
+    if not params:
+        cache_key = f"{methodid}:{os.stat(methodid.classfile()).st_mtime_ns}"
+        try:
+            cache = json.loads(CACHE.read_text())
+        except (OSError, ValueError):
+            cache = {}
+        if cache_key in cache:
+            l.debug("cache hit for %s", cache_key)
+            outcomes = set(cache[cache_key])
+
+    if outcomes is None:
+        inputs = []
+        seen = set()
+        for _ in range(SAMPLES):
+            args = tuple(sample(p) for p in params)
+            if args not in seen:
+                seen.add(args)
+                inputs.append(args)
+            if not params:
+                break
+
+        # Executions are independent, so they can fan out over processes;
+        # the serial path keeps the saturation early-exit.
+        workers = int(os.environ.get("JPAMB_WORKERS", "1"))
+        if workers > 1:
+            with multiprocessing.Pool(workers) as pool:
+                outcomes = set(pool.map(partial(execute, code), inputs, chunksize=8))
+        else:
+            outcomes = set()
+            for args in inputs:
+                outcomes.add(execute(code, args))
+                # Every query answered: further runs cannot change the wagers.
+                if outcomes >= QUERY_SET:
+                    break
+
+        l.debug("saw %s over %d distinct inputs", outcomes, len(inputs))
+
+        if cache_key is not None:
+            cache[cache_key] = sorted(outcomes)
+            try:
+                CACHE.parent.mkdir(parents=True, exist_ok=True)
+                CACHE.write_text(json.dumps(cache))
+            except OSError:
+                pass
+
+    # A detected cycle is proof of looping; an exhausted budget is still
+    # strong evidence.
+    if "*" in outcomes:
+        print("*;95%")
+    elif "out of time" in outcomes:
+        print("*;80%")
+    else:
+        print("*;5%")
+    for query in QUERIES:
+        # Fuzzing is sound for "yes": an observed outcome really happens.
+        # An unobserved one may just need an input we never drew.
+        print(f"{query};95%" if query in outcomes else f"{query};25%")
@@ -2,68 +2,550 @@
 """ The skeleton for writing an interpreter given the bytecode.
 """
 
-from dataclasses import dataclass
-import sys, logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+import operator
+import os, sys, logging
 from typing import Optional
 
-from jpamb_utils import InputParser, IntValue, MethodId
+from pathlib import Path
+
+from jpamb_utils import InputParser, IntValue, MethodId, load_classfile
+
+
+@lru_cache(maxsize=None)
+def load_class(classname):
+    """Load a class by its slashed name and index its members by name,
+    so member lookups are dict hits instead of linear scans."""
+    classfile = load_classfile(
+        Path("decompiled", *classname.split("/")).with_suffix(".json")
+    )
+    classfile["_method_index"] = {
+        (m["name"], len(m["params"])): m for m in classfile["methods"]
+    }
+    classfile["_field_index"] = {f["name"]: f for f in classfile["fields"]}
+    return classfile
+
+
+def resolve_static_field(field):
+    """Resolve a static field to its value.  `$assertionsDisabled` is
+    false since the test suite runs with assertions enabled."""
+    if field["name"] == "$assertionsDisabled":
+        return 0
+    f = load_class(field["class"])["_field_index"][field["name"]]
+    return (f.get("value") or {"value": 0})["value"]
+
+
+def find_method(classname, name, args):
+    """Find the code of a method by its slashed classname, name and
+    argument types, as they appear in an invoke instruction."""
+    return load_class(classname)["_method_index"][name, len(args)]["code"]
+
+# Stepwise tracing costs more than the steps themselves (the f-strings
+# format the full stack and locals), so only pay for it when asked to.
+TRACE = bool(os.environ.get("TRACE"))
 
 l = logging
-l.basicConfig(level=logging.DEBUG, format="%(message)s")
+l.basicConfig(level=logging.DEBUG if TRACE else logging.WARNING, format="%(message)s")
+
+# The conditions used by the `if` and `ifz` opcodes, resolved to the
+# C-implemented comparators instead of a chain of string comparisons.
+CMP = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "le": operator.le,
+    "gt": operator.gt,
+    "ge": operator.ge,
+}
 
+# Binary operants without special semantics; div and rem stay in the
+# handler because of the zero check and Java's truncated division.
+BIN = {
+    "add": operator.add,
+    "sub": operator.sub,
+    "mul": operator.mul,
+}
 
-@dataclass
+
+@dataclass(slots=True)
 class SimpleInterpreter:
     bytecode: list
     locals: list
     stack: list
     pc: int = 0
     done: Optional[str] = None
+    code: Optional[list] = field(init=False, repr=False, default=None)
+    limit: int = field(init=False, repr=False, default=10)
+    heap: dict = field(default_factory=dict)
+    # The next free heap reference.  A monotonic counter keeps
+    # allocation O(1) instead of scanning the heap for a free slot.
+    next_ref: int = 0
+    # The value produced by a `return` with a type, picked up by callers.
+    retval: Optional[object] = None
 
-    def interpet(self, limit=10):
-        for i in range(limit):
-            next = self.bytecode[self.pc]
-            l.debug(f"STEP {i}:")
-            l.debug(f"  PC: {self.pc} {next}")
-            l.debug(f"  LOCALS: {self.locals}")
-            l.debug(f"  STACK: {self.stack}")
-
-            if fn := getattr(self, "step_" + next["opr"], None):
-                fn(next)
-            else:
-                return f"can't handle {next['opr']!r}"
+    def alloc(self, obj) -> int:
+        ref = self.next_ref
+        self.next_ref = ref + 1
+        self.heap[ref] = obj
+        return ref
 
-            if self.done:
+    def __post_init__(self):
+        # Quicken: resolve each instruction to its handler once, so the
+        # loop below dispatches on a precomputed (handler, operand)
+        # pair instead of a per-step dict lookup.
+        self.code = []
+        for bc in self.bytecode:
+            if (entry := self.quicken(bc)) is None:
+                self.code = None
                 break
+            self.code.append(entry)
+        if self.code is not None:
+            self.fuse()
+
+    def fuse(self):
+        """Peephole-fuse common instruction triples into one handler, so
+        loop bodies spend one dispatch instead of three.  The fused
+        entry replaces the first instruction and skips over the others,
+        which stay in place so branch targets remain valid; triples are
+        only fused when no branch lands in the middle."""
+        bytecode = self.bytecode
+        targets = {bc["target"] for bc in bytecode if "target" in bc}
+        i = 0
+        while i + 2 < len(bytecode):
+            b0, b1, b2 = bytecode[i : i + 3]
+            if i + 1 in targets or i + 2 in targets:
+                i += 1
+                continue
+            if (
+                i + 3 < len(bytecode)
+                and i + 3 not in targets
+                and b0["opr"] == "new"
+                and b1["opr"] == "dup"
+                and b2["opr"] == "invoke"
+                and b2["access"] == "special"
+                and b2["method"]["name"] == "<init>"
+                and not b2["method"]["args"]
+                and bytecode[i + 3]["opr"] == "throw"
+            ):
+                # The new/dup/<init>/throw constructor idiom; the object
+                # never escapes, so resolve the outcome at fuse time.
+                if b0["class"] == "java/lang/AssertionError":
+                    outcome = "assertion error"
+                else:
+                    outcome = b0["class"]
+                self.code[i] = (SimpleInterpreter.step_fused_new_throw, outcome)
+                i += 4
+            elif (
+                i + 3 < len(bytecode)
+                and i + 3 not in targets
+                and b0["opr"] == "dup"
+                and b1["opr"] == "push"
+                and b1["value"] is not None
+                and b2["opr"] == "push"
+                and b2["value"] is not None
+                and bytecode[i + 3]["opr"] == "array_store"
+            ):
+                # Array-literal element stores: dup ref, push index, push
+                # value, store.  The index is in range by construction.
+                fused = (b1["value"]["value"], b2["value"]["value"])
+                self.code[i] = (SimpleInterpreter.step_fused_array_init, fused)
+                i += 4
+            elif (
+                b0["opr"] == "load"
+                and b1["opr"] == "load"
+                and b2["opr"] == "binary"
+                and b2["operant"] in BIN
+            ):
+                fused = {
+                    "i": b0["index"],
+                    "j": b1["index"],
+                    "op": BIN[b2["operant"]],
+                }
+                self.code[i] = (SimpleInterpreter.step_fused_load_load_binary, fused)
+                i += 3
+            elif (
+                b0["opr"] == "load"
+                and b1["opr"] == "push"
+                and b1["value"] is not None
+                and b1["value"]["type"] == "integer"
+                and b2["opr"] == "if"
+            ):
+                fused = {
+                    "index": b0["index"],
+                    "value": b1["value"]["value"],
+                    "cmp": CMP[b2["condition"]],
+                    "target": b2["target"],
+                }
+                self.code[i] = (SimpleInterpreter.step_fused_load_push_if, fused)
+                i += 3
+            elif (
+                b0["opr"] == "load"
+                and b1["opr"] == "push"
+                and b1["value"] is not None
+                and b1["value"]["type"] == "integer"
+                and b2["opr"] == "binary"
+                and b2["operant"] in BIN
+            ):
+                fused = {
+                    "index": b0["index"],
+                    "value": b1["value"]["value"],
+                    "op": BIN[b2["operant"]],
+                }
+                self.code[i] = (SimpleInterpreter.step_fused_load_push_binary, fused)
+                i += 3
+            else:
+                i += 1
+
+    def step_fused_new_throw(self, outcome):
+        self.done = outcome
+
+    def step_fused_load_load_binary(self, bc):
+        self.stack.append(bc["op"](self.locals[bc["i"]], self.locals[bc["j"]]))
+        self.pc += 3
+
+    def step_fused_array_init(self, arg):
+        index, value = arg
+        self.heap[self.stack[-1]][index] = value
+        self.pc += 4
+
+    def step_fused_load_push_binary(self, bc):
+        self.stack.append(bc["op"](self.locals[bc["index"]], bc["value"]))
+        self.pc += 3
+
+    def step_fused_load_push_if(self, bc):
+        if bc["cmp"](self.locals[bc["index"]], bc["value"]):
+            self.pc = bc["target"]
         else:
-            self.done = "out of time"
+            self.pc += 3
 
-        l.debug(f"DONE {self.done}")
-        l.debug(f"  LOCALS: {self.locals}")
-        l.debug(f"  STACK: {self.stack}")
+    def quicken(self, bc):
+        """Pick the (handler, operand) entry for an instruction,
+        specializing on operand types known at quickening time and
+        pre-extracting constant operands where the handler allows it."""
+        C = SimpleInterpreter
+        opr = bc["opr"]
+        if opr == "push":
+            val = bc["value"]
+            return (C.step_push, val["value"] if val is not None else None)
+        if opr == "load":
+            return (C.step_load, bc["index"])
+        if opr == "store":
+            return (C.step_store, bc["index"])
+        if opr == "goto":
+            return (C.step_goto, bc["target"])
+        if opr == "incr":
+            return (C.step_incr, (bc["index"], bc["amount"]))
+        if opr == "if" or opr == "ifz":
+            # Resolve the condition to its comparator here, so branches
+            # skip the condition-name lookup per execution.
+            return (HANDLERS[opr], (CMP[bc["condition"]], bc["target"]))
+        if opr == "binary":
+            # The operant is fixed per site, so bind the operator (or the
+            # dedicated div/rem handler) instead of re-looking it up.
+            if (op := BIN.get(bc["operant"])) is not None:
+                return (C.step_binary_op, op)
+            fn = HANDLERS.get(f"binary_{bc['operant']}")
+            return None if fn is None else (fn, None)
+        if opr == "cast":
+            fn = HANDLERS.get(f"cast_{bc['from']}_{bc['to']}")
+        else:
+            fn = HANDLERS.get(opr)
+        return None if fn is None else (fn, bc)
 
-        return self.done
+    def interpet(self, limit=10):
+        self.limit = limit
+        if self.code is None:
+            for bc in self.bytecode:
+                if self.quicken(bc) is None:
+                    return f"can't handle {bc['opr']!r}"
 
-    def step_push(self, bc):
-        val = bc["value"]
-        if val is not None:
-            if val["type"] == "integer":
-                val = IntValue(val["value"])
+        code = self.code
+        # Brent-style cycle detection: snapshot the full machine state at
+        # power-of-two step counts and compare against it; a repeat means
+        # the program can never terminate.  The per-step cost between
+        # snapshots is a single int comparison on the pc.
+        snap = None
+        snap_pc = -1
+        power = next_snap = 16
+        if TRACE:
+            for i in range(limit):
+                fn, next = code[self.pc]
+                l.debug("STEP %d:", i)
+                l.debug("  PC: %d %s", self.pc, next)
+                l.debug("  LOCALS: %s", self.locals)
+                l.debug("  STACK: %s", self.stack)
+                fn(self, next)
+                if self.done:
+                    break
+                if self.pc == snap_pc and snap == (
+                    self.locals,
+                    self.stack,
+                    self.heap,
+                ):
+                    l.debug("CYCLE at pc %d", self.pc)
+                    self.done = "*"
+                    break
+                if i == next_snap:
+                    snap_pc, snap = self.pc, self.snapshot()
+                    power *= 2
+                    next_snap = i + power
             else:
-                raise ValueError(f"Currently unknown value {bc}")
+                self.done = "out of time"
+        else:
+            # The tight loop: no logging, not even the flag check.
+            for i in range(limit):
+                fn, next = code[self.pc]
+                fn(self, next)
+                if self.done:
+                    break
+                if self.pc == snap_pc and snap == (
+                    self.locals,
+                    self.stack,
+                    self.heap,
+                ):
+                    self.done = "*"
+                    break
+                if i == next_snap:
+                    snap_pc, snap = self.pc, self.snapshot()
+                    power *= 2
+                    next_snap = i + power
+            else:
+                self.done = "out of time"
+
+        if TRACE:
+            l.debug("DONE %s", self.done)
+            l.debug("  LOCALS: %s", self.locals)
+            l.debug("  STACK: %s", self.stack)
+
+        return self.done
+
+    def snapshot(self):
+        """Copy the mutable machine state for cycle detection."""
+        heap = {
+            ref: obj[:] if isinstance(obj, list) else dict(obj)
+            for ref, obj in self.heap.items()
+        }
+        return (list(self.locals), list(self.stack), heap)
+
+    def step_push(self, value):
+        # Integers (and booleans, chars) live on the stack as plain
+        # Python ints; `null` is None.  The constant is decoded at
+        # quickening time.
+        self.stack.append(value)
+        self.pc += 1
+
+    def step_if(self, arg):
+        cmp, target = arg
+        v2 = self.stack.pop()
+        v1 = self.stack.pop()
+        if cmp(v1, v2):
+            self.pc = target
+        else:
+            self.pc += 1
+
+    def step_ifz(self, arg):
+        cmp, target = arg
+        if cmp(self.stack.pop(), 0):
+            self.pc = target
+        else:
+            self.pc += 1
 
-        self.stack.insert(0, val)
+    def step_goto(self, target):
+        self.pc = target
+
+    def step_load(self, index):
+        self.stack.append(self.locals[index])
+        self.pc += 1
+
+    def step_store(self, index):
+        if index >= len(self.locals):
+            self.locals.extend([None] * (index + 1 - len(self.locals)))
+        self.locals[index] = self.stack.pop()
+        self.pc += 1
+
+    def step_incr(self, arg):
+        index, amount = arg
+        self.locals[index] += amount
+        self.pc += 1
+
+    def step_binary_op(self, op):
+        v2 = self.stack.pop()
+        v1 = self.stack.pop()
+        self.stack.append(op(v1, v2))
+        self.pc += 1
+
+    def step_binary_div(self, _):
+        v2 = self.stack.pop()
+        v1 = self.stack.pop()
+        if v2 == 0:
+            self.done = "divide by zero"
+            return
+        # Java division truncates towards zero; correct floor division
+        # when the signs differ and there is a remainder.
+        q, r = divmod(v1, v2)
+        if r and (v1 < 0) != (v2 < 0):
+            q += 1
+        self.stack.append(q)
+        self.pc += 1
+
+    def step_binary_rem(self, _):
+        v2 = self.stack.pop()
+        v1 = self.stack.pop()
+        if v2 == 0:
+            self.done = "divide by zero"
+            return
+        # The Java remainder takes the sign of the dividend.
+        r = v1 % v2
+        if r and (v1 < 0) != (v2 < 0):
+            r -= v2
+        self.stack.append(r)
+        self.pc += 1
+
+    def step_get(self, bc):
+        # Inline cache: the field a get-site resolves to never changes,
+        # so remember the value on the instruction after the first hit.
+        try:
+            value = bc["_value"]
+        except KeyError:
+            value = bc["_value"] = resolve_static_field(bc["field"])
+        self.stack.append(value)
+        self.pc += 1
+
+    def step_new(self, bc):
+        # Build the instance template (class name plus any default
+        # fields) once per site; each allocation is then a dict copy.
+        try:
+            template = bc["_template"]
+        except KeyError:
+            template = bc["_template"] = {"class": sys.intern(bc["class"])}
+        self.stack.append(self.alloc(template.copy()))
+        self.pc += 1
+
+    def step_newarray(self, bc):
+        size = self.stack.pop()
+        if size < 0:
+            self.done = "negative array size"
+            return
+        self.stack.append(self.alloc([0] * size))
         self.pc += 1
 
+    def step_array_load(self, bc):
+        index = self.stack.pop()
+        ref = self.stack.pop()
+        if ref is None:
+            self.done = "null pointer"
+            return
+        array = self.heap[ref]
+        if not 0 <= index < len(array):
+            self.done = "out of bounds"
+            return
+        self.stack.append(array[index])
+        self.pc += 1
+
+    def step_array_store(self, bc):
+        value = self.stack.pop()
+        index = self.stack.pop()
+        ref = self.stack.pop()
+        if ref is None:
+            self.done = "null pointer"
+            return
+        array = self.heap[ref]
+        if not 0 <= index < len(array):
+            self.done = "out of bounds"
+            return
+        # The heap entry is a mutable list, so write the element in
+        # place; copying the array here would make fill loops quadratic.
+        array[index] = value
+        self.pc += 1
+
+    def step_arraylength(self, bc):
+        ref = self.stack.pop()
+        if ref is None:
+            self.done = "null pointer"
+            return
+        self.stack.append(len(self.heap[ref]))
+        self.pc += 1
+
+    def step_cast_int_short(self, bc):
+        # Sign-extend the low 16 bits, Java's (short) narrowing cast.
+        self.stack.append(((self.stack.pop() + 0x8000) & 0xFFFF) - 0x8000)
+        self.pc += 1
+
+    def step_dup(self, bc):
+        self.stack.append(self.stack[-1])
+        self.pc += 1
+
+    def step_throw(self, bc):
+        ref = self.stack.pop()
+        if ref is None:
+            self.done = "null pointer"
+        elif self.heap[ref]["class"] == "java/lang/AssertionError":
+            self.done = "assertion error"
+        else:
+            self.done = self.heap[ref]["class"]
+
     def step_return(self, bc):
         if bc["type"] is not None:
-            self.stack.pop(0)
+            self.retval = self.stack.pop()
         self.done = "ok"
 
+    def step_invoke(self, bc):
+        method = bc["method"]
+        nargs = len(method["args"])
+        stack = self.stack
+        if nargs:
+            # Pop all arguments with one slice instead of inserting them
+            # one by one at the front of a list.
+            args = stack[-nargs:]
+            del stack[-nargs:]
+        else:
+            args = []
+        if bc["access"] == "special":
+            # Constructors: drop the receiver, the objects we model have
+            # no fields to initialize.
+            stack.pop()
+            self.pc += 1
+            return
+        code = find_method(method["ref"]["name"], method["name"], method["args"])
+        locals = args + [None] * (code["max_locals"] - nargs)
+        sub = SimpleInterpreter(
+            code["bytecode"], locals, [], heap=self.heap, next_ref=self.next_ref
+        )
+        result = sub.interpet(self.limit)
+        self.next_ref = sub.next_ref
+        if result != "ok":
+            self.done = result
+            return
+        if method["returns"] is not None:
+            stack.append(sub.retval)
+        self.pc += 1
+
+
+# The opr-name to handler table, built once at module load.  Entries are
+# the plain functions, called as handler(interpreter, instruction).
+HANDLERS = {
+    name[len("step_") :]: fn
+    for name, fn in vars(SimpleInterpreter).items()
+    if name.startswith("step_")
+}
+
 
 if __name__ == "__main__":
     methodid = MethodId.parse(sys.argv[1])
     inputs = InputParser.parse(sys.argv[2])
     m = methodid.load()
-    i = SimpleInterpreter(m["code"]["bytecode"], [i.tolocal() for i in inputs], [])
-    print(i.interpet())
+    # Locals are slot-indexed, so pre-size the list to the method's
+    # declared max_locals; the input values fill the first slots.
+    locals = [i.tolocal() for i in inputs]
+    locals.extend([None] * (m["code"]["max_locals"] - len(locals)))
+    i = SimpleInterpreter(m["code"]["bytecode"], locals, [])
+    # Array inputs arrive as tuples; give them a mutable home on the heap
+    # and leave the reference in the local slot.
+    for n, v in enumerate(i.locals):
+        if isinstance(v, tuple):
+            i.locals[n] = i.alloc(list(v))
+    result = i.interpet(1_000_000)
+    # Exhausting a budget this size without a detected cycle still points
+    # at non-termination, just with unbounded state.
+    print("*" if result == "out of time" else result)
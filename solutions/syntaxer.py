@@ -2,7 +2,9 @@
 """ A very stupid syntatic analysis, that only checks for assertion errors.
 """
 
+import mmap
 import sys, logging
+from functools import lru_cache
 from jpamb_utils import MethodId
 import tree_sitter
 import tree_sitter_java
@@ -13,26 +15,53 @@ parser = tree_sitter.Parser(JAVA_LANGUAGE)
 l = logging
 l.basicConfig(level=logging.DEBUG)
 
+
+@lru_cache(maxsize=None)
+def read_sourcefile(srcfile):
+    """Map the file read-only instead of copying it into a bytes object;
+    the substring scan below runs directly on the mapping."""
+    with open(srcfile, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@lru_cache(maxsize=None)
+def parse_sourcefile(srcfile):
+    """Parse a source file at most once, however many methods share it."""
+    l.debug("parse sourcefile %s", srcfile)
+    return parser.parse(bytes(read_sourcefile(srcfile)))
+
+
 (name,) = sys.argv[1:]
 method = MethodId.parse(name)
 
 srcfile = method.sourcefile()
 
-with open(srcfile, "rb") as f:
-    l.debug("parse sourcefile %s", srcfile)
-    tree = parser.parse(f.read())
+# A parse cannot find an assert statement that the raw bytes do not
+# contain, so answer the cheap way first.
+if read_sourcefile(srcfile).find(b"assert") < 0:
+    l.debug("no 'assert' anywhere in %s", srcfile)
+    print("assertion error;20%")
+    sys.exit(0)
+
+tree = parse_sourcefile(srcfile)
 
 simple_classname = method.class_name.split(".")[-1]
 
+
 # To figure out how to write these you can consult the
 # https://tree-sitter.github.io/tree-sitter/playground
-class_q = JAVA_LANGUAGE.query(
-    f"""
-    (class_declaration 
-        name: ((identifier) @class-name 
+@lru_cache(maxsize=None)
+def class_query(simple_classname):
+    return JAVA_LANGUAGE.query(
+        f"""
+    (class_declaration
+        name: ((identifier) @class-name
                (#eq? @class-name "{simple_classname}"))) @class
 """
-)
+    )
+
+
+class_q = class_query(simple_classname)
 
 for node in class_q.captures(tree.root_node)["class"]:
     break
@@ -44,13 +73,19 @@ l.debug("Found class %s", node.range)
 
 method_name = method.method_name
 
-method_q = JAVA_LANGUAGE.query(
-    f"""
-    (method_declaration name: 
+
+@lru_cache(maxsize=None)
+def method_query(method_name):
+    return JAVA_LANGUAGE.query(
+        f"""
+    (method_declaration name:
       ((identifier) @method-name (#eq? @method-name "{method_name}"))
     ) @method
 """
-)
+    )
+
+
+method_q = method_query(method_name)
 
 for node in method_q.captures(node)["method"]:
     if not (p := node.child_by_field_name("parameters")):
@@ -77,7 +112,7 @@ assert body and body.text
 for t in body.text.splitlines():
     l.debug("line: %s", t.decode())
 
-assert_q = JAVA_LANGUAGE.query(f"""(assert_statement) @assert""")
+assert_q = JAVA_LANGUAGE.query("""(assert_statement) @assert""")
 
 for node, t in assert_q.captures(body).items():
     if node == "assert":